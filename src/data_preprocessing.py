@@ -1,10 +1,22 @@
 import pandas as pd
 import numpy as np
 import sys, os
-from datetime import datetime
 import networkx as nx
+from scipy.sparse import csr_array
 
-def signed_data(data):
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# column types of the raw and processed csv files
+DATA_DTYPES = {'FROM_NODE': np.int32, 'TO_NODE': np.int32, 'TRUST_INDEX': np.int8, 'TIME_SINCE_EPOCH': np.float64}
+
+# below this many rows the numba thread start-up costs more than np.sign
+NUMBA_MIN_ROWS = 1_000_000
+
+def signed_data(data, inplace=False):
     '''
     Function to modify the data to keep only the sign of the trust values
     
@@ -13,11 +25,15 @@ def signed_data(data):
     data: pandas DataFrame
         The data to be modified
         It should have a column called TRUST_INDEX
+    inplace: bool, default False
+        If True, overwrite the TRUST_INDEX column of data instead of
+            returning a modified copy
     
     Returns
     -------
     data_signed: pandas DataFrame
         The modified data
+        TRUST_INDEX holds -1, 0 or 1 as int8, whatever its input dtype
     
     Examples
     --------
@@ -27,15 +43,34 @@ def signed_data(data):
     >>> data_signed = signed_data(data)
     >>> data_signed
        TRUST_INDEX
-    0          1.0
-    1         -1.0
-    2          1.0
-    3         -1.0
+    0            1
+    1           -1
+    2            1
+    3           -1
+    >>> data_signed['TRUST_INDEX'].dtype
+    dtype('int8')
     '''
-    data_signed = data.copy()
-    data_signed['TRUST_INDEX'] = np.sign(data_signed['TRUST_INDEX'])
+    # shallow copy: only TRUST_INDEX is replaced, the other columns are shared
+    data_signed = data if inplace else data.copy(deep=False)
+    trust_index = data['TRUST_INDEX'].to_numpy()
+    if njit is not None and len(trust_index) > NUMBA_MIN_ROWS:
+        data_signed['TRUST_INDEX'] = _sign_int8(trust_index)
+    else:
+        data_signed['TRUST_INDEX'] = np.sign(trust_index).astype(np.int8, copy=False)
     return data_signed
 
+def _sign_int8(values):
+    '''
+    Sign of each value as int8, compiled with numba into a parallel loop when it is installed
+    '''
+    signs = np.empty(values.shape[0], np.int8)
+    for i in prange(values.shape[0]):
+        signs[i] = (values[i] > 0) - (values[i] < 0)
+    return signs
+
+if njit is not None:
+    _sign_int8 = njit(parallel=True, cache=True)(_sign_int8)
+
 def epoch_to_datetime(data):
     '''
     Change the epoch time to datetime
@@ -52,6 +87,7 @@ def epoch_to_datetime(data):
         The modified data
         Instead of the column TIME_SINCE_EPOCH,
             there is a column called TIME
+        Only needed for readable times, divide_data_into_periods_epoch works on the epoch time directly
 
     Examples
     --------
@@ -67,8 +103,10 @@ def epoch_to_datetime(data):
     2 2019-01-03 00:00:00
     3 2019-01-04 00:00:00
     '''
-    data['TIME'] = data['TIME_SINCE_EPOCH'].apply(lambda x: datetime.fromtimestamp(x))
-    data = data.drop('TIME_SINCE_EPOCH', axis=1)
+    # int64 microseconds keep the sub-second precision of the raw epochs
+    microseconds = (data['TIME_SINCE_EPOCH'].to_numpy(dtype=np.float64) * 1e6).round().astype(np.int64)
+    time = pd.to_datetime(microseconds, unit='us')
+    data = data.drop('TIME_SINCE_EPOCH', axis=1).assign(TIME=time)
     return data
 
 def divide_data_into_periods(data,num_periods):
@@ -89,6 +127,7 @@ def divide_data_into_periods(data,num_periods):
         The modified data
         Instead of the column TIME,
             there is a column called PERIOD
+            Rows whose time is missing get NaN as their PERIOD, as with pd.cut
     
     Examples
     --------
@@ -104,10 +143,95 @@ def divide_data_into_periods(data,num_periods):
     2       1
     3       1
     '''
-    data['PERIOD'] = pd.cut(data['TIME'], bins=num_periods, labels=False)
+    time = data['TIME'].to_numpy(dtype='datetime64[ns]')
+    data['PERIOD'] = _equal_width_bins(time, num_periods)
     data = data.drop('TIME', axis=1)
     return data
 
+def divide_data_into_periods_epoch(data, num_periods):
+    '''
+    Divides the input DataFrame into num_periods equally spaced periods based on the epoch time
+        Same periods as divide_data_into_periods, without converting the epoch time to datetime first
+
+    Parameters
+    ----------
+    data: pandas DataFrame
+        The data to be modified
+        It should have a column called TIME_SINCE_EPOCH
+    num_periods: int
+        The number of periods to divide the data into
+
+    Returns
+    -------
+    data: pandas DataFrame
+        The modified data
+        Instead of the column TIME_SINCE_EPOCH,
+            there is a column called PERIOD
+            Rows whose time is missing get NaN as their PERIOD, as with pd.cut
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> import numpy as np
+    >>> data = pd.DataFrame({'TIME_SINCE_EPOCH': np.array([1546300800, 1546387200, 1546473600, 1546560000])})
+    >>> data_timed = divide_data_into_periods_epoch(data,2)
+    >>> data_timed
+       PERIOD
+    0       0
+    1       0
+    2       1
+    3       1
+    '''
+    data['PERIOD'] = _equal_width_bins(data['TIME_SINCE_EPOCH'].to_numpy(), num_periods)
+    data = data.drop('TIME_SINCE_EPOCH', axis=1)
+    return data
+
+def _equal_width_bins(values, num_periods):
+    '''
+    Label each value with the equally spaced interval it falls into, as pd.cut does
+
+    Parameters
+    ----------
+    values: numpy array
+        The values to be labeled, numbers or datetime64
+    num_periods: int
+        The number of intervals between the minimum and maximum value
+
+    Returns
+    -------
+    labels: numpy array
+        The interval of each value, from 0 to num_periods - 1, in a signed integer dtype of at least 16 bits
+            Missing values (NaN or NaT) are labeled NaN in a float64 array instead, as in pd.cut
+    '''
+    if num_periods < 1:
+        raise ValueError("`bins` should be a positive integer.")
+    dtype = np.result_type(np.int16, np.min_scalar_type(-num_periods))
+    datetimes = values.dtype.kind == 'M'
+    if datetimes:
+        missing = np.isnat(values)
+        values = values.view(np.int64)
+    else:
+        missing = np.isnan(values) if values.dtype.kind == 'f' else np.zeros(len(values), dtype=bool)
+    # the missing values are left out of the range, NaT would otherwise be the minimum
+    present = values[~missing] if missing.any() else values
+    if len(present) == 0:
+        raise ValueError("Cannot cut empty array")
+    minimum, maximum = present.min(), present.max()
+    if minimum == maximum:
+        # pd.cut widens a constant range around its value, which then falls in the middle interval
+        labels = np.full(len(values), (num_periods - 1) // 2, dtype=dtype)
+    else:
+        # the same edges as pd.cut, datetimes spaced in integers since int64 nanoseconds do not fit in a double
+        if datetimes:
+            edges = np.linspace(0, maximum - minimum, num_periods + 1, dtype=np.int64) + minimum
+        else:
+            edges = np.linspace(minimum, maximum, num_periods + 1)
+        # intervals include their upper edge and not their lower one, as in pd.cut, except for the minimum
+        labels = np.searchsorted(edges[1:-1], values, side='left').astype(dtype)
+    if missing.any():
+        labels = np.where(missing, np.nan, labels)
+    return labels
+
 def select_negative_nodes(data):
     '''
     This function selects the TO_NODEs that have negative TRUST_INDEX values
@@ -120,7 +244,7 @@ def select_negative_nodes(data):
     
     Returns
     -------
-    negative_nodes: numpy array
+    negative_nodes: numpy array of int64
         The nodes that have negative TRUST_INDEX values
     
     Examples
@@ -130,10 +254,11 @@ def select_negative_nodes(data):
     >>> data = pd.DataFrame({'FROM_NODE': np.array([1, 2, 3, 4]), 'TO_NODE': np.array([2, 3, 4, 1]), 'TRUST_INDEX': np.array([1, -1, 1, -1])})
     >>> negative_nodes = select_negative_nodes(data)
     >>> negative_nodes
-    array([2, 1])
+    array([3, 1])
     '''
-    data_negative = data[data['TRUST_INDEX'] < 0]
-    negative_nodes = data_negative['TO_NODE'].unique()
+    negative = data['TRUST_INDEX'].to_numpy() < 0
+    # int64 keeps pd.unique on its typed hashtable even if TO_NODE was read as another dtype
+    negative_nodes = pd.unique(data['TO_NODE'].to_numpy()[negative].astype(np.int64, copy=False))
     return negative_nodes
 
 def create_direct_network(data):
@@ -160,17 +285,73 @@ def create_direct_network(data):
     >>> network_data.edges(data=True)
     OutEdgeDataView([(1, 2, {'weight': 1}), (2, 3, {'weight': -1}), (3, 4, {'weight': 1}), (4, 1, {'weight': -1})])
     '''
-    network_data = nx.from_pandas_edgelist(data, 'FROM_NODE', 'TO_NODE', edge_attr='TRUST_INDEX', create_using=nx.DiGraph())
+    from_nodes = data['FROM_NODE'].to_numpy().tolist()
+    to_nodes = data['TO_NODE'].to_numpy().tolist()
+    weights = data['TRUST_INDEX'].to_numpy().tolist()
+    network_data = nx.DiGraph()
+    network_data.add_weighted_edges_from(zip(from_nodes, to_nodes, weights))
     return network_data
 
 
+def create_csr_network(data):
+    '''
+    Create a weighted adjacency matrix in CSR format from data
+        Much more compact than a DiGraph for algorithms that scan every edge
+
+    Parameters
+    ----------
+    data: pandas DataFrame
+        It should contain the columns FROM_NODE,TO_NODE and TRUST_INDEX
+        The TRUST_INDEX will correspond to the weight of each edge
+        Repeated edges have their TRUST_INDEX summed
+
+    Returns
+    -------
+    adjacency: scipy sparse csr_array
+        The matrix with the weight of the edge from node i to node j at row i and column j
+    nodes: numpy array
+        The node of each row and column, in increasing order
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> import numpy as np
+    >>> data = pd.DataFrame({'FROM_NODE': np.array([10, 20, 30, 40]), 'TO_NODE': np.array([20, 30, 40, 10]), 'TRUST_INDEX': np.array([1, -1, 1, -1])})
+    >>> adjacency, nodes = create_csr_network(data)
+    >>> nodes
+    array([10, 20, 30, 40])
+    >>> adjacency.toarray()
+    array([[ 0,  1,  0,  0],
+           [ 0,  0, -1,  0],
+           [ 0,  0,  0,  1],
+           [-1,  0,  0,  0]])
+    '''
+    from_nodes = data['FROM_NODE'].to_numpy()
+    # map the node ids to 0..n-1 so rows and columns are contiguous
+    nodes, node_index = np.unique(np.concatenate([from_nodes, data['TO_NODE'].to_numpy()]), return_inverse=True)
+    number_of_edges = len(from_nodes)
+    adjacency = csr_array((data['TRUST_INDEX'].to_numpy(), (node_index[:number_of_edges], node_index[number_of_edges:])), shape=(len(nodes), len(nodes)))
+    return adjacency, nodes
+
 
 if __name__ == '__main__':
     # append the path of the project directory to the system path
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-    file_path = "data/processed/soc-sign-bitcoinotc-signed.csv"
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    raw_file_path = "data/raw/soc-sign-bitcoinotc.csv"
+    file_path = "data/processed/soc-sign-bitcoinotc-signed.parquet"
+    # stream the raw data through signed_data so only one chunk is held in memory
+    chunks = pd.read_csv(raw_file_path, header=0, dtype=DATA_DTYPES, chunksize=500_000)
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(signed_data(chunk, inplace=True), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(file_path, table.schema, compression='zstd')
+        writer.write_table(table)
+    writer.close()
     lines = 100
-    data = pd.read_csv(file_path, nrows=lines,header=0)
+    data = pd.read_parquet(file_path).head(lines)
     print(data.head())
     data_timed = epoch_to_datetime(data)
     print(data_timed.head())
@@ -2,8 +2,53 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+import hashlib
+import logging
+import random
+import sys
+from scipy.sparse.csgraph import connected_components, shortest_path
+from scipy.sparse.linalg import eigs
 
-def calculate_network_summary_statistics(network_data):
+try:
+    import igraph as ig
+except ImportError:
+    ig = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    from joblib import Parallel, delayed
+except ImportError:
+    Parallel = None
+
+try:
+    from numba import get_num_threads, njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# networkx backends to dispatch to when installed, fastest first
+NETWORKX_BACKENDS = ('cugraph', 'graphblas')
+
+# number of results kept by each of the caches keyed on _graph_fingerprint
+CACHE_SIZE = 32
+
+# Fruchterman-Reingold iterations of the spring layout, enough for the plots to settle
+LAYOUT_ITERATIONS = 20
+
+_summary_statistics_cache = {}
+_centralities_cache = {}
+_layout_cache = {}
+
+logger = logging.getLogger(__name__)
+
+# number of source nodes whose distances are held in memory at once by _shortest_path_statistics
+SHORTEST_PATH_BLOCK_SIZE = 256
+
+def calculate_network_summary_statistics(network_data, verbose=False, shortest_paths=True):
     '''
     Calculate basic network summary statistics
 
@@ -11,6 +56,12 @@ def calculate_network_summary_statistics(network_data):
     ----------
     network_data: Weighted DiGraph
         The network to be analyzed
+    verbose: bool, default False
+        If True, print the values of the network summary statistics
+            They are always logged at the INFO level, formatted only if that level is enabled
+    shortest_paths: bool, default True
+        If False, skip the all pairs shortest paths and report the diameter
+            and the average shortest path length as None
     
     Returns
     -------
@@ -19,19 +70,23 @@ def calculate_network_summary_statistics(network_data):
             number_of_nodes: number of nodes in the network
             number_of_edges: number of edges in the network
             clustering_coefficient: clustering coefficient of the network
-            modularity: modularity of the network
+            modularity: modularity of the network, None if it is directed or has no edges
             connected_components: number of connected components in the network
             edge_density: edge density of the network
             diameter: diameter of the network
             average_shortest_path_length: average shortest path length of the network
+            degree_histogram: number of nodes with each degree, indexed by degree
 
             
     Prints
     ------
-    Graph:
-        Shows the distribution of the degrees of the nodes in the network
     Additional information:
-        Prints the values of the network summary statistics
+        Prints the values of the network summary statistics if verbose is True
+
+    Notes
+    -----
+    The results are cached on the structure of the network,
+        so calling again with an unchanged network returns without recomputing them
 
     Examples
     --------
@@ -42,7 +97,7 @@ def calculate_network_summary_statistics(network_data):
     >>> network_data.add_edge(1, 3, weight=9.8)
     >>> network_data.add_edge(2, 3, weight=0.5)
     >>> network_data.add_edge(3, 1, weight=0.5)
-    >>> network_stats = calculate_network_summary_statistics(network_data)
+    >>> network_stats = calculate_network_summary_statistics(network_data, verbose=True)
     Calculating network summary statistics...
     Number of nodes:  3
     Number of edges:  3
@@ -60,51 +115,272 @@ def calculate_network_summary_statistics(network_data):
     Average shortest path length:  1.0
     Calculating degree distribution...
     '''
+    key = (_graph_fingerprint(network_data), shortest_paths)
+    if key not in _summary_statistics_cache:
+        _cache_result(_summary_statistics_cache, key, _network_summary_statistics(network_data, shortest_paths))
+    network_stats, report = _summary_statistics_cache[key]
+    if logger.isEnabledFor(logging.INFO):
+        for line in report:
+            logger.info(*line)
+    if verbose:
+        sys.stdout.write(''.join(line[0] % line[1:] + '\n' for line in report))
+    # copy, including the degree histogram array, so that callers modifying the result do not modify the cache
+    network_stats = dict(network_stats)
+    network_stats['degree_histogram'] = network_stats['degree_histogram'].copy()
+    return network_stats
+
+def _network_summary_statistics(network_data, shortest_paths=True):
+    '''
+    Calculate the statistics of calculate_network_summary_statistics without caching
+
+    Returns
+    -------
+    network_stats: dict
+        The statistics on the network
+    report: list of tuple
+        The lines describing the calculation and its values
+            Each is a format string followed by its arguments, formatted only when logged or printed
+    '''
     network_stats = {}
-    print("Calculating network summary statistics...")
+    # collect the printout and write it once at the end
+    report = []
+    directed = network_data.is_directed()
+    # igraph runs the traversals in C; networkx is the fallback when it is not installed
+    ig_graph = ig.Graph.from_networkx(network_data) if ig is not None else None
+    if ig_graph is None:
+        # one CSR matrix serves scipy's connected components and shortest paths
+        adjacency = nx.to_scipy_sparse_array(network_data, weight=None, format='csr')
+    report.append(("Calculating network summary statistics...",))
     network_stats['number_of_nodes'] = network_data.number_of_nodes()
-    print("Number of nodes: ", network_stats['number_of_nodes'])
+    report.append(("Number of nodes:  %s", network_stats['number_of_nodes']))
     network_stats['number_of_edges'] = network_data.number_of_edges()
-    print("Number of edges: ", network_stats['number_of_edges'])
-    print("Calculating clustering coefficient...")
-    network_stats['clustering_coefficient'] = nx.average_clustering(network_data)
-    print("Clustering coefficient: ", network_stats['clustering_coefficient'])
+    report.append(("Number of edges:  %s", network_stats['number_of_edges']))
+    report.append(("Calculating clustering coefficient...",))
+    if ig_graph is not None and not directed:
+        network_stats['clustering_coefficient'] = ig_graph.transitivity_avglocal_undirected(mode='zero')
+    else:
+        backend = _networkx_backend(nx.average_clustering)
+        if backend is not None:
+            network_stats['clustering_coefficient'] = nx.average_clustering(network_data, backend=backend)
+        else:
+            network_stats['clustering_coefficient'] = nx.average_clustering(network_data)
+    report.append(("Clustering coefficient:  %s", network_stats['clustering_coefficient']))
     # check if the network is undirected
-    if nx.is_directed(network_data) is False:
-        print("Calculating modularity...")
-        network_stats['modularity'] = nx.algorithms.community.modularity(network_data, nx.algorithms.community.label_propagation_communities(network_data))
-        print("Modularity: ", network_stats['modularity'])
-        print("Calculating connected components...")
-        network_stats['connected_components'] = nx.number_connected_components(network_data)
-        print("Number of connected components: ", network_stats['connected_components'])
+    if not directed:
+        report.append(("Calculating modularity...",))
+        if network_stats['number_of_edges'] == 0:
+            # modularity divides by the number of edges: igraph would return nan and networkx raise
+            network_stats['modularity'] = None
+        elif ig_graph is not None:
+            network_stats['modularity'] = _louvain_modularity(network_data, ig_graph)
+        else:
+            # the same statistic as _louvain_modularity: an unweighted Louvain partition scored with the weights
+            communities = nx.algorithms.community.louvain_communities(network_data, weight=None, seed=0)
+            network_stats['modularity'] = nx.algorithms.community.modularity(network_data, communities)
+        report.append(("Modularity:  %s", network_stats['modularity']))
+        report.append(("Calculating connected components...",))
+        if ig_graph is not None:
+            network_stats['connected_components'] = len(ig_graph.connected_components())
+        else:
+            network_stats['connected_components'] = connected_components(adjacency, directed=False, return_labels=False)
+        report.append(("Number of connected components:  %s", network_stats['connected_components']))
     else:
         network_stats['modularity'] = None
         network_stats['connected_components'] = None
-    print("Calculating edge density...")
+    report.append(("Calculating edge density...",))
     network_stats['edge_density'] = nx.density(network_data)
-    print("Edge density: ", network_stats['edge_density'])
-    print("Calculating diameter...")
-    try:
-        network_stats['diameter'] = nx.diameter(network_data)
-    except nx.exception.NetworkXError:
+    report.append(("Edge density:  %s", network_stats['edge_density']))
+    if shortest_paths:
+        report.append(("Calculating diameter...",))
+        if ig_graph is None:
+            network_stats['diameter'], average_shortest_path_length = _shortest_path_statistics(adjacency, directed)
+        elif network_stats['number_of_nodes'] < 2:
+            # igraph averages over no pairs of nodes into nan; report 0 as _shortest_path_statistics does
+            network_stats['diameter'], average_shortest_path_length = 0, 0
+        # mode is ignored for undirected graphs
+        elif ig_graph.is_connected(mode='strong'):
+            network_stats['diameter'] = ig_graph.diameter(directed=True, unconn=False)
+            average_shortest_path_length = ig_graph.average_path_length(directed=True, unconn=False)
+        else:
+            network_stats['diameter'], average_shortest_path_length = None, None
+        report.append(("Diameter:  %s", network_stats['diameter']))
+        report.append(("Calculating average shortest path length...",))
+        network_stats['average_shortest_path_length'] = average_shortest_path_length
+        report.append(("Average shortest path length:  %s", network_stats['average_shortest_path_length']))
+    else:
         network_stats['diameter'] = None
-    print("Diameter: ", network_stats['diameter'])
-    print("Calculating average shortest path length...")
-    if network_stats['diameter'] == None:
         network_stats['average_shortest_path_length'] = None
-    else:
-        network_stats['average_shortest_path_length'] = nx.average_shortest_path_length(network_data)
-    print("Average shortest path length: ", network_stats['average_shortest_path_length'])
-    print("Calculating degree distribution...")
-    degrees = [network_data.degree(n) for n in network_data.nodes()]
+    report.append(("Calculating degree distribution...",))
+    degrees = np.fromiter((degree for _, degree in network_data.degree()), dtype=np.int32, count=network_stats['number_of_nodes'])
+    network_stats['degree_histogram'] = np.bincount(degrees)
+    return network_stats, report
+
+def _louvain_modularity(network_data, ig_graph):
+    '''
+    Calculate the modularity of the communities found by igraph's Louvain method
+
+    Parameters
+    ----------
+    network_data: Weighted Graph
+        The undirected network to be analyzed
+    ig_graph: igraph.Graph
+        The same network converted with igraph.Graph.from_networkx
+
+    Returns
+    -------
+    modularity: float
+        The modularity of the communities, weighted by the weight attribute as in networkx
+            Without igraph, nx.algorithms.community.louvain_communities finds the communities instead
+    '''
+    # Louvain visits the nodes in a random order, drawn from the random module unless the caller gave igraph
+    # another generator; seeding the module and restoring its state keeps the statistics reproducible
+    # without replacing that generator
+    state = random.getstate()
+    random.seed(0)
+    try:
+        membership = ig_graph.community_multilevel().membership
+    finally:
+        random.setstate(state)
+    weights = None
+    if 'weight' in ig_graph.es.attributes():
+        # networkx counts an edge without a weight as 1
+        weights = [1 if weight is None else weight for weight in ig_graph.es['weight']]
+    if weights is None or min(weights, default=0) >= 0:
+        return ig_graph.modularity(membership, weights=weights)
+    # igraph rejects negative weights, which networkx keeps in the sums
+    communities = [set() for _ in range(max(membership) + 1)]
+    for node, community in zip(network_data, membership):
+        communities[community].add(node)
+    return nx.algorithms.community.modularity(network_data, communities)
+
+def _graph_fingerprint(graph):
+    '''
+    Hash the nodes, edges and edge weights of graph, using xxhash when it is installed
+
+    Parameters
+    ----------
+    graph: Weighted DiGraph
+        The network to be hashed
+
+    Returns
+    -------
+    fingerprint: bytes
+        Equal for graphs with the same nodes in the same order, edges and weights
+    '''
+    nodes = list(graph)
+    hasher = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    hasher.update(repr((type(graph).__name__, graph.number_of_edges(), nodes)).encode())
+    # networkx refuses to build the matrix of a graph without nodes, which has no edges to hash anyway
+    if nodes:
+        adjacency = nx.to_scipy_sparse_array(graph, nodelist=nodes, format='csr')
+        for array in (adjacency.indptr, adjacency.indices, adjacency.data):
+            hasher.update(array.tobytes())
+    return hasher.digest()
+
+def _cache_result(cache, key, value):
+    '''
+    Store value in cache, dropping the oldest entry once it holds CACHE_SIZE results
+    '''
+    if len(cache) >= CACHE_SIZE:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+def analyze_all_periods(period_graphs, n_jobs=-1):
+    '''
+    Calculate the network summary statistics of each period in parallel
+
+    Parameters
+    ----------
+    period_graphs: list of Weighted DiGraph
+        The network of each period, in period order
+    n_jobs: int, default -1
+        The number of worker processes, -1 uses every core
+        Ignored when joblib is not installed and the periods are analyzed one after the other
+
+    Returns
+    -------
+    period_stats: list of dict
+        The output of calculate_network_summary_statistics for each period, in period order
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> data = pd.DataFrame({'FROM_NODE': np.array([1, 2, 3, 4]), 'TO_NODE': np.array([2, 3, 4, 1]), 'TRUST_INDEX': np.array([1, -1, 1, -1]), 'PERIOD': np.array([0, 0, 1, 1])})
+    >>> period_graphs = [create_direct_network(period_data) for _, period_data in data.groupby('PERIOD')]
+    >>> period_stats = analyze_all_periods(period_graphs, n_jobs=2)
+    >>> [stats['number_of_edges'] for stats in period_stats]
+    [2, 2]
+    '''
+    if Parallel is None:
+        return [calculate_network_summary_statistics(graph) for graph in period_graphs]
+    return Parallel(n_jobs=n_jobs, backend='loky')(delayed(calculate_network_summary_statistics)(graph) for graph in period_graphs)
+
+def plot_degree_distribution(network_stats):
+    '''
+    Plot the degree distribution calculated by calculate_network_summary_statistics
+
+    Parameters
+    ----------
+    network_stats: dict
+        A dictionary containing the statistics on the network
+        It should have a key called degree_histogram
+
+    Returns
+    -------
+    None
+
+    Prints
+    ------
+    Graph:
+        Shows the distribution of the degrees of the nodes in the network
+
+    Examples
+    --------
+    >>> plot_degree_distribution({'degree_histogram': np.array([0, 0, 3])})
+    '''
+    degree_histogram = network_stats['degree_histogram']
     bins = list(range(0, 101, 10))  # defining bins from 0 to 100 with step 10
-    plt.hist(degrees, bins=bins)
+    plt.hist(np.arange(len(degree_histogram)), bins=bins, weights=degree_histogram)
     plt.xticks(bins)  # setting x-axis ticks to the bin edges
     plt.xlabel('Degree')
     plt.ylabel('Frequency')
     plt.title('Degree Distribution')
     plt.show()
-    return network_stats
+
+def _shortest_path_statistics(adjacency, directed):
+    '''
+    Calculate the diameter and average shortest path length from a single all pairs shortest path computation
+
+    Parameters
+    ----------
+    adjacency: scipy.sparse.csr_array
+        The adjacency matrix of the network to be analyzed
+    directed: bool
+        Whether the edges of the network are directed
+
+    Returns
+    -------
+    diameter: int or None
+        The diameter of the network, None if some node cannot reach another
+    average_shortest_path_length: float or None
+        The average shortest path length of the network, None if the diameter is None
+    '''
+    number_of_nodes = adjacency.shape[0]
+    if number_of_nodes < 2:
+        return 0, 0
+    # a linear pass finds networks where some node cannot reach another before any search is run
+    if connected_components(adjacency, directed=directed, connection='strong', return_labels=False) > 1:
+        return None, None
+    diameter, total_path_length = 0, 0.0
+    # breadth first searches in C, a block of sources at a time to bound the memory of the distance matrix
+    for start in range(0, number_of_nodes, SHORTEST_PATH_BLOCK_SIZE):
+        sources = np.arange(start, min(start + SHORTEST_PATH_BLOCK_SIZE, number_of_nodes))
+        distances = shortest_path(adjacency, method='D', directed=directed, unweighted=True, indices=sources)
+        if np.isinf(distances).any():
+            return None, None
+        diameter = max(diameter, int(distances.max()))
+        total_path_length += distances.sum()
+    return diameter, float(total_path_length / (number_of_nodes * (number_of_nodes - 1)))
 
 
 def create_negative_nodes_subgraph(graph, negative_node_list):
@@ -135,16 +411,15 @@ def create_negative_nodes_subgraph(graph, negative_node_list):
     >>> negative_nodes = np.array([2, 1])
     >>> negative_nodes_graph = create_negative_nodes_subgraph(network_data, negative_nodes)
     >>> negative_nodes_graph.edges(data=True)
-    OutEdgeDataView([(1, 3, {'weight': -9.8}), (2, 3, {'weight': -0.5})])
-    '''
-    negative_nodes_graph = nx.DiGraph()
-    for node in negative_node_list:
-        negative_nodes_graph.add_node(node)
-    for edge in graph.edges():
-        if edge[0] in negative_node_list or edge[1] in negative_node_list:
-            negative_nodes_graph.add_node(edge[0])  # Ensure the nodes are in the subgraph
-            negative_nodes_graph.add_node(edge[1])
-            negative_nodes_graph.add_edge(edge[0], edge[1])
+    OutEdgeDataView([(1, 2, {'weight': 0.5}), (1, 3, {'weight': -9.8}), (2, 3, {'weight': -0.5}), (3, 1, {'weight': 0.5})])
+    '''
+    negative_nodes = dict.fromkeys(np.asarray(negative_node_list).tolist())
+    # visit only the edges at the negative nodes instead of testing every edge of the graph
+    negative_edges = list(graph.edges(negative_nodes))
+    if graph.is_directed():
+        negative_edges.extend(graph.in_edges(negative_nodes))
+    negative_nodes_graph = graph.edge_subgraph(negative_edges).copy()
+    negative_nodes_graph.add_nodes_from(negative_nodes)
     return negative_nodes_graph
 
 
@@ -177,19 +452,25 @@ def visualize_network_of_negative_nodes(negative_nodes_graph, negative_node_list
     >>> network_data = create_direct_network(data)
     >>> negative_nodes = select_negative_nodes(data)
     >>> visualize_network_of_negative_nodes(network_data, negative_nodes)
+    >>> no_negative_nodes = np.array([], dtype=np.int64)
+    >>> visualize_network_of_negative_nodes(create_negative_nodes_subgraph(network_data, no_negative_nodes), no_negative_nodes)
     '''
-    # Create list of nodes that are in negative_node_list and in negative_nodes_graph
-    negative_node_list = [node for node in negative_node_list if node in negative_nodes_graph.nodes]
+    # color every node in one pass so that the nodes are drawn once, negative nodes in red
+    negative_nodes = set(np.asarray(negative_node_list).tolist())
+    node_colors = ['r' if node in negative_nodes else '#1f78b4' for node in negative_nodes_graph]
     # Visualize the subgraph
     plt.figure(figsize=(10, 10))
-    pos = nx.spring_layout(negative_nodes_graph)
-    nx.draw_networkx_nodes(negative_nodes_graph, pos, cmap=plt.get_cmap('jet'), node_size=500)
+    # the layout is seeded, so it is the same each time the network is drawn and can be reused
+    key = _graph_fingerprint(negative_nodes_graph)
+    if key not in _layout_cache:
+        _cache_result(_layout_cache, key, nx.spring_layout(negative_nodes_graph, iterations=LAYOUT_ITERATIONS, seed=0))
+    pos = _layout_cache[key]
+    nx.draw_networkx_nodes(negative_nodes_graph, pos, node_color=node_colors, node_size=500)
     nx.draw_networkx_edges(negative_nodes_graph, pos, edgelist=negative_nodes_graph.edges(), edge_color='black')
-    nx.draw_networkx_nodes(negative_nodes_graph, pos, nodelist=negative_node_list, node_color='r', node_size=500)
     plt.title('Network of Negative Nodes')
     plt.show()
 
-def calculate_centralities_negative_nodes(graph, negative_nodes_list):
+def calculate_centralities_negative_nodes(graph, negative_nodes_list, measures=('degree_centrality', 'betweenness_centrality', 'eigenvector_centrality'), max_iter=None, tol=0, period_key=None):
     '''
     Calculate centrality measures for each node in negative_nodes_list
         Include calculate degree centrality, betweenness centrality, eigenvector centrality
@@ -200,14 +481,34 @@ def calculate_centralities_negative_nodes(graph, negative_nodes_list):
         The network to be analyzed
     negative_nodes_list: numpy array
         The nodes that have negative TRUST_INDEX values
+        Nodes that are not in graph are ignored
+    measures: tuple of str, default all three measures
+        The centrality measures to calculate
+            Leaving out betweenness_centrality or eigenvector_centrality skips their computation
+    max_iter: int, default None
+        The maximum number of iterations of the eigenvector centrality's sparse eigensolver
+            None uses ARPACK's default of ten times the number of nodes
+            Networks that are not strongly connected use networkx's power iteration instead, with at least 1000
+    tol: float, default 0
+        The relative accuracy of the eigenvector centrality, 0 meaning machine precision
+            The power iteration uses networkx's 1e-6 for 0
+    period_key: hashable, default None
+        A key identifying the network, such as its period, to cache the results on
+            None caches them on the structure of the network instead
+            The network must not change while it is given the same key
     
     Returns
     -------
     centralities: dict
-        A dictionary containing the centrality measures for each node in negative_nodes_list
+        A dictionary containing the requested centrality measures for each node in negative_nodes_list
             degree_centrality: degree centrality of each node in negative_nodes_list
             betweenness_centrality: betweenness centrality of each node in negative_nodes_list
             eigenvector_centrality: eigenvector centrality of each node in negative_nodes_list
+
+    Notes
+    -----
+    The results are cached on the network (or period_key) and the negative nodes,
+        so asking again for the same period returns without recomputing them
     
     Examples
     --------
@@ -225,18 +526,269 @@ def calculate_centralities_negative_nodes(graph, negative_nodes_list):
     >>> centralities['betweenness_centrality']
     {1: 0.5, 2: 0.0}
     >>> centralities['eigenvector_centrality']
-    {1: 0.5484320099232192, 2: 0.4139987636359533}
+    {1: 0.5484317579318064, 2: 0.4139988855231332}
+    >>> two_cycles = nx.DiGraph([(1, 2), (2, 1), (3, 4), (4, 3)])
+    >>> calculate_centralities_negative_nodes(two_cycles, np.array([1, 3]), measures=('eigenvector_centrality',))
+    {'eigenvector_centrality': {1: 0.5, 3: 0.5}}
+    '''
+    # convert to Python scalars once, dropping duplicates but keeping the order
+    negative_nodes = [node for node in dict.fromkeys(np.asarray(negative_nodes_list).tolist()) if node in graph]
+    graph_key = _graph_fingerprint(graph) if period_key is None else ('period', period_key)
+    key = (graph_key, tuple(negative_nodes), tuple(measures), max_iter, tol)
+    if key not in _centralities_cache:
+        _cache_result(_centralities_cache, key, _centralities_negative_nodes(graph, negative_nodes, measures, max_iter, tol))
+    # copy so that callers modifying the result do not modify the cache
+    return {measure: dict(values) for measure, values in _centralities_cache[key].items()}
+
+def _centralities_negative_nodes(graph, negative_nodes, measures, max_iter, tol):
     '''
+    Calculate the centralities of calculate_centralities_negative_nodes without caching
+        negative_nodes must be in graph and free of duplicates
+    '''
+    node_index = {node: i for i, node in enumerate(graph)}
+    # positions of the negative nodes in the graph's node order, to gather them from whole-network arrays
+    negative_index = np.fromiter((node_index[node] for node in negative_nodes), dtype=np.int64, count=len(negative_nodes))
     centralities = {}
-    centralities['degree_centrality'] = nx.degree_centrality(graph)
-    centralities['betweenness_centrality'] = nx.betweenness_centrality(graph)
-    centralities['eigenvector_centrality'] = nx.eigenvector_centrality(graph)
-    # filter the centralities to only include the nodes in negative_nodes_list
+    if 'degree_centrality' in measures:
+        # only the negative nodes' degrees are needed, scaled as nx.degree_centrality does
+        degrees = np.fromiter((degree for _, degree in graph.degree(negative_nodes)), dtype=np.float64, count=len(negative_nodes))
+        centralities['degree_centrality'] = degrees * (1.0 / (len(node_index) - 1)) if len(node_index) > 1 else np.ones(len(negative_nodes))
+    if 'betweenness_centrality' in measures:
+        centralities['betweenness_centrality'] = _betweenness_centrality(graph, negative_nodes)
+    if 'eigenvector_centrality' in measures:
+        centralities['eigenvector_centrality'] = _eigenvector_centrality(graph, max_iter, tol)[negative_index]
+    # every array is aligned with negative_nodes
     negative_nodes_centralities = {}
-    for key in centralities.keys():
-        negative_nodes_centralities[key] = {k: centralities[key][k] for k in negative_nodes_list}
+    for key, values in centralities.items():
+        negative_nodes_centralities[key] = dict(zip(negative_nodes, values.tolist()))
     return negative_nodes_centralities
 
+def _betweenness_centrality(graph, nodes):
+    '''
+    Calculate the normalized betweenness centrality of nodes
+        Uses a networkx backend, numba (given several threads) or igraph when one is installed
+
+    Parameters
+    ----------
+    graph: Weighted DiGraph
+        The network to be analyzed
+    nodes: list
+        The nodes whose betweenness centrality is needed
+
+    Returns
+    -------
+    betweenness_centrality: np.ndarray
+        The betweenness centrality of each of nodes, in the same order
+    '''
+    # normalize by the size of the whole network, as networkx does
+    number_of_nodes = graph.number_of_nodes()
+    scale = 1.0
+    if number_of_nodes > 2:
+        scale = (1 if graph.is_directed() else 2) / ((number_of_nodes - 1) * (number_of_nodes - 2))
+    if not nodes:
+        return np.zeros(0)
+    # every shortest path through a node stays inside its component, so the other components can be skipped
+    graph = _components_containing(graph, nodes)
+    backend = _networkx_backend(nx.betweenness_centrality)
+    if backend is not None:
+        betweenness = nx.betweenness_centrality(graph, normalized=False, backend=backend)
+    elif ig is not None and (njit is None or get_num_threads() < 2):
+        # on a single thread igraph's C is faster than the numba kernel, which only wins in parallel
+        node_index = {node: i for i, node in enumerate(graph)}
+        ig_graph = ig.Graph.from_networkx(graph)
+        betweenness = np.array(ig_graph.betweenness(vertices=[node_index[node] for node in nodes], directed=True), dtype=np.float64)
+    elif njit is not None:
+        node_index = {node: i for i, node in enumerate(graph)}
+        adjacency = nx.to_scipy_sparse_array(graph, weight=None, format='csr')
+        # spread the sources over more chunks than threads so uneven searches balance out
+        raw_betweenness = _brandes_betweenness(adjacency.indptr, adjacency.indices, len(node_index), 4 * get_num_threads())
+        if not graph.is_directed():
+            # every pair was searched from both ends
+            raw_betweenness /= 2
+        betweenness = raw_betweenness[np.array([node_index[node] for node in nodes], dtype=np.int64)]
+    else:
+        betweenness = nx.betweenness_centrality(graph, normalized=False)
+    if isinstance(betweenness, dict):
+        betweenness = np.array([betweenness[node] for node in nodes], dtype=np.float64)
+    return betweenness * scale
+
+def _brandes_betweenness(indptr, indices, number_of_nodes, number_of_chunks):
+    '''
+    Unnormalized betweenness of every node of an unweighted CSR adjacency matrix (Brandes' algorithm)
+        Compiled with numba into a loop over chunks of source nodes running in parallel
+        Undirected graphs must be given both directions of each edge, and every pair is counted twice
+
+    Parameters
+    ----------
+    indptr: numpy array
+        The indptr array of the CSR adjacency matrix
+    indices: numpy array
+        The indices array of the CSR adjacency matrix
+    number_of_nodes: int
+        The number of rows of the matrix
+    number_of_chunks: int
+        The number of chunks the source nodes are split into
+
+    Returns
+    -------
+    betweenness: numpy array
+        The betweenness of each row of the matrix
+    '''
+    # one row per chunk so that the chunks never write to the same memory
+    betweenness = np.zeros((number_of_chunks, number_of_nodes))
+    for chunk in prange(number_of_chunks):
+        distance = np.full(number_of_nodes, -1, np.int64)
+        paths = np.zeros(number_of_nodes)
+        dependency = np.zeros(number_of_nodes)
+        order = np.empty(number_of_nodes, np.int64)
+        for source in range(chunk, number_of_nodes, number_of_chunks):
+            # breadth first search, counting the shortest paths from source to every node
+            distance[source] = 0
+            paths[source] = 1.0
+            order[0] = source
+            head, tail = 0, 1
+            while head < tail:
+                v = order[head]
+                head += 1
+                for k in range(indptr[v], indptr[v + 1]):
+                    w = indices[k]
+                    if distance[w] < 0:
+                        distance[w] = distance[v] + 1
+                        order[tail] = w
+                        tail += 1
+                    if distance[w] == distance[v] + 1:
+                        paths[w] += paths[v]
+            # accumulate dependencies from the farthest nodes back, through the successors of each node
+            for i in range(tail - 1, -1, -1):
+                v = order[i]
+                for k in range(indptr[v], indptr[v + 1]):
+                    w = indices[k]
+                    if distance[w] == distance[v] + 1:
+                        dependency[v] += paths[v] / paths[w] * (1.0 + dependency[w])
+                if v != source:
+                    betweenness[chunk, v] += dependency[v]
+            # reset only the nodes this search reached
+            for i in range(tail):
+                v = order[i]
+                distance[v] = -1
+                paths[v] = 0.0
+                dependency[v] = 0.0
+    return betweenness.sum(axis=0)
+
+if njit is not None:
+    _brandes_betweenness = njit(parallel=True, cache=True)(_brandes_betweenness)
+
+def _components_containing(graph, nodes):
+    '''
+    Restrict graph to the (weakly) connected components that contain at least one of nodes
+
+    Parameters
+    ----------
+    graph: Weighted DiGraph
+        The network to be restricted
+    nodes: list
+        The nodes whose components are kept
+
+    Returns
+    -------
+    graph: Weighted DiGraph
+        A subgraph view of the kept components, or graph itself if every component is kept
+    '''
+    components = nx.weakly_connected_components(graph) if graph.is_directed() else nx.connected_components(graph)
+    nodes = set(nodes)
+    kept_nodes = [node for component in components if not nodes.isdisjoint(component) for node in component]
+    if len(kept_nodes) == graph.number_of_nodes():
+        return graph
+    return graph.subgraph(kept_nodes)
+
+def _networkx_backend(function):
+    '''
+    Find the first of NETWORKX_BACKENDS that is installed and implements function
+
+    Parameters
+    ----------
+    function: callable
+        A networkx function that supports the backend keyword
+
+    Returns
+    -------
+    backend: str or None
+        The name to pass as backend, None if no backend implements function
+    '''
+    implemented = getattr(function, 'backends', ())
+    for backend in NETWORKX_BACKENDS:
+        if backend in implemented:
+            return backend
+    return None
+
+def _eigenvector_centrality(graph, max_iter=None, tol=0):
+    '''
+    Calculate the eigenvector centrality of every node with a sparse eigensolver
+
+    Parameters
+    ----------
+    graph: Weighted DiGraph
+        The network to be analyzed
+    max_iter: int, default None
+        The maximum number of iterations, None for ten times the number of nodes as in ARPACK
+            and at least 1000 for the power iteration, whose convergence can be slow
+    tol: float, default 0
+        The relative accuracy of the eigenvector, 0 meaning machine precision
+            Networks that are not strongly connected use the power iteration, with networkx's 1e-6 for 0
+
+    Returns
+    -------
+    eigenvector_centrality: np.ndarray
+        The eigenvector centrality of each node in the graph's node order, normalized to unit length
+            For directed graphs this is the in-edge (left) eigenvector, as in networkx
+    '''
+    nodes = list(graph)
+    adjacency = nx.to_scipy_sparse_array(graph, nodelist=nodes, weight=None, dtype=float, format='csr')
+    if connected_components(adjacency, directed=True, connection='strong', return_labels=False) > 1:
+        # the leading eigenvalue of a network that is not strongly connected can be repeated, and the eigensolvers
+        # then return an arbitrary vector of its eigenspace (networkx gh-6888); the power iteration of
+        # nx.eigenvector_centrality from the uniform vector is well defined, so it is used instead
+        largest = _power_iteration(adjacency, max(10 * len(nodes), 1000) if max_iter is None else max_iter, tol or 1e-6)
+    elif len(nodes) < 3:
+        # ARPACK needs at least 3 nodes to find a single eigenvector
+        values, vectors = np.linalg.eig(adjacency.T.toarray())
+        largest = vectors[:, np.argmax(values.real)].real
+    else:
+        _, vectors = eigs(adjacency.T, k=1, which='LR', v0=np.ones(len(nodes)), maxiter=max_iter, tol=tol)
+        largest = vectors[:, 0].real
+    largest = largest / (np.sign(largest.sum()) * np.linalg.norm(largest))
+    return largest
+
+def _power_iteration(adjacency, max_iter, tol):
+    '''
+    Run the power iteration of nx.eigenvector_centrality on a CSR adjacency matrix
+
+    Parameters
+    ----------
+    adjacency: scipy.sparse.csr_array
+        The adjacency matrix of the network
+    max_iter: int
+        The maximum number of iterations
+    tol: float
+        The tolerance of networkx's convergence check, on the L1 change per node
+
+    Returns
+    -------
+    eigenvector: np.ndarray
+        The in-edge (left) eigenvector the iteration converges to, normalized to unit length
+    '''
+    number_of_nodes = adjacency.shape[0]
+    transpose = adjacency.T.tocsr()
+    x = np.full(number_of_nodes, 1.0 / number_of_nodes)
+    for _ in range(max_iter):
+        last = x
+        # iterate with A + I, so that the iteration converges on bipartite networks too
+        x = last + transpose @ last
+        x /= np.linalg.norm(x) or 1
+        if np.abs(x - last).sum() < number_of_nodes * tol:
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
 def calculate_mean_centrality_negative_nodes(negative_nodes_centralities):
     '''
     Calculate the mean centrality for each centrality measure in negative_nodes_centralities
@@ -271,11 +823,11 @@ def calculate_mean_centrality_negative_nodes(negative_nodes_centralities):
     >>> mean_centrality['betweenness_centrality']
     0.25
     >>> mean_centrality['eigenvector_centrality']
-    0.4812153867795862
+    0.48121532172746984
     '''
     mean_centrality = {}
-    for key in negative_nodes_centralities.keys():
-        mean_centrality[key] = np.mean(list(negative_nodes_centralities[key].values()))
+    for key, values in negative_nodes_centralities.items():
+        mean_centrality[key] = float(np.fromiter(values.values(), dtype=np.float64, count=len(values)).mean())
     return mean_centrality
 
 def time_series_centralities(*centrality_dicts):
@@ -325,29 +877,18 @@ def time_series_centralities(*centrality_dicts):
     num_periods = len(centrality_dicts)
     # Create x axis: Period 0, Period 1, ..., Period n
     x = np.arange(num_periods)
-    # Create 3 dataframes for each centrality measure
-    degree_centrality = pd.DataFrame(columns=['Period', 'Degree Centrality'])
-    betweenness_centrality = pd.DataFrame(columns=['Period', 'Betweenness Centrality'])
-    eigenvector_centrality = pd.DataFrame(columns=['Period', 'Eigenvector Centrality'])
-    for i in range(num_periods):
-        degree_centrality.loc[i] = [i, centrality_dicts[i]['degree_centrality']]
-        betweenness_centrality.loc[i] = [i, centrality_dicts[i]['betweenness_centrality']]
-        eigenvector_centrality.loc[i] = [i, centrality_dicts[i]['eigenvector_centrality']]
+    measures = ['degree_centrality', 'betweenness_centrality', 'eigenvector_centrality']
+    titles = ['Degree Centrality', 'Betweenness Centrality', 'Eigenvector Centrality']
+    # one row per period and one column per centrality measure
+    centralities = np.array([[centrality_dict[measure] for measure in measures] for centrality_dict in centrality_dicts], dtype=np.float64).reshape(num_periods, len(measures))
     # Create 3 subplots for each centrality measure
     fig, axs = plt.subplots(3, figsize=(10, 10))
     fig.suptitle('Time Series of Centrality Measures')
-    axs[0].plot(x, degree_centrality['Degree Centrality'])
-    axs[0].set_title('Degree Centrality')
-    axs[0].set_xlabel('Period')
-    axs[0].set_ylabel('Degree Centrality')
-    axs[1].plot(x, betweenness_centrality['Betweenness Centrality'])
-    axs[1].set_title('Betweenness Centrality')
-    axs[1].set_xlabel('Period')
-    axs[1].set_ylabel('Betweenness Centrality')
-    axs[2].plot(x, eigenvector_centrality['Eigenvector Centrality'])
-    axs[2].set_title('Eigenvector Centrality')
-    axs[2].set_xlabel('Period')
-    axs[2].set_ylabel('Eigenvector Centrality')
+    for column, title in enumerate(titles):
+        axs[column].plot(x, centralities[:, column])
+        axs[column].set_title(title)
+        axs[column].set_xlabel('Period')
+        axs[column].set_ylabel(title)
     plt.tight_layout()
     plt.show()
 
@@ -28,14 +28,35 @@ def calculate_time_statistics(data):
     Graph:
         Shows the distribution of the time column plotted on a histogram with 100 bins
     '''
+    time = data['TIME'].to_numpy()
     time_stats = {}
-    time_stats['min'] = data['TIME'].min()
-    time_stats['max'] = data['TIME'].max()
-    time_stats['mean'] = data['TIME'].mean()
-    time_stats['median'] = data['TIME'].median()
-    time_stats['std'] = data['TIME'].std()
+    if time.dtype.kind == 'M' and not np.isnat(time).all():
+        # reduce the integer timestamps in the column's own unit instead of going through the Series each time
+        unit = np.datetime_data(time.dtype)[0]
+        # NaT is skipped, as the Series reductions do
+        values = time[~np.isnat(time)].view(np.int64)
+        time_min, time_max = values.min(), values.max()
+        time_stats['min'] = pd.Timestamp(np.datetime64(int(time_min), unit))
+        time_stats['max'] = pd.Timestamp(np.datetime64(int(time_max), unit))
+        # int() truncates the floating point results as pandas does
+        time_stats['mean'] = pd.Timestamp(np.datetime64(int(values.mean()), unit))
+        # np.median selects the middle values with a partition rather than a sort
+        time_stats['median'] = pd.Timestamp(np.datetime64(int(np.median(values)), unit))
+        time_stats['std'] = pd.Timedelta(np.timedelta64(int(values.std(ddof=1)), unit))
 
-    data['TIME'].hist(bins=100, color='skyblue', edgecolor='black')
+        # the range is already known, so np.histogram does not scan for it again
+        counts, edges = np.histogram(values, bins=100, range=(time_min, time_max))
+        edges = edges.astype(np.int64).astype(time.dtype)
+        plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color='skyblue', edgecolor='black')
+        plt.grid(True)  # Series.hist drew the grid by default
+    else:
+        # numeric, timezone aware or empty times are left to the Series reductions
+        time_stats['min'] = data['TIME'].min()
+        time_stats['max'] = data['TIME'].max()
+        time_stats['mean'] = data['TIME'].mean()
+        time_stats['median'] = data['TIME'].median()
+        time_stats['std'] = data['TIME'].std()
+        data['TIME'].hist(bins=100, color='skyblue', edgecolor='black')
     plt.title('Frequency of Entries per Day', fontsize=16)
     plt.xlabel('Time', fontsize=14)
     plt.ylabel('Frequency', fontsize=14)
@@ -51,10 +72,9 @@ def conduct_hypothesis_test(data):
 if __name__ == '__main__':
     from data_preprocessing import epoch_to_datetime
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-    file_path = "data/processed/soc-sign-bitcoinotc-signed.csv"
-    # lines = 100
-    # data = pd.read_csv(file_path, nrows=lines,header=0)
-    data = pd.read_csv(file_path, header=0)
+    file_path = "data/processed/soc-sign-bitcoinotc-signed.parquet"
+    # the time statistics only need the timestamps, so the node and trust columns are not read
+    data = pd.read_parquet(file_path, columns=['TIME_SINCE_EPOCH'])
     data = epoch_to_datetime(data)
     time_stats = calculate_time_statistics(data)
     print(time_stats)
\ No newline at end of file